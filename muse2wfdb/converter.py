@@ -9,18 +9,36 @@ License: MIT
 
 
 import os
-import base64
+import re
+import sys
+import mmap
+import hashlib
 import logging
+import zipfile
+import tempfile
 
 from pathlib import Path
 from contextlib import contextmanager
-from typing import Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
 
 
 import wfdb
 import xmltodict
 import numpy as np
 
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, fall back to xmltodict
+    etree = None
+
+try:
+    from pybase64 import b64decode
+    PARALLEL_DECODE = True  # pybase64 releases the GIL while decoding
+except ImportError:  # pybase64 is optional, fall back to the standard library
+    from base64 import b64decode
+    PARALLEL_DECODE = False
+
 
 logger = logging.getLogger(__name__)
 
@@ -30,18 +48,44 @@ LEAD_NAMES: List[str] = [
     'V1', 'V2', 'V3', 'V4', 'V5', 'V6'
 ]
 
+# Column of each lead in the (N, 12) signal matrix, also by normalized lead ID
+LEAD_INDEX: Dict[str, int] = {name: i for i, name in enumerate(LEAD_NAMES)}
+UPPER_LEAD_INDEX: Dict[str, int] = {name.upper(): i for i, name in enumerate(LEAD_NAMES)}
+
 QRS_TYPE_MAP = {
     "0": "N",   # Normal
     "1": "V",   # Ventricular
     "2": "S",   # Supraventricular
 }
 
+# Leads stored in the MUSE export, the remaining ones are derived from I and II
+MEASURED_LEAD_NAMES: List[str] = [
+    'I', 'II', 'V1', 'V2', 'V3', 'V4', 'V5', 'V6'
+]
+
+# Total base64 size from which leads are decoded on multiple threads
+PARALLEL_DECODE_MIN_SIZE = 1 << 20
+
+# Version of the cached conversion arrays, bump when their contents change
+CACHE_FORMAT_VERSION = 1
+
+# MUSE stores the samples as little-endian int16
+NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
 UNIT_SCALE_MAP = {
     "MICROVOLTS": 0.001,  # µV → mV
     "MILLIVOLTS": 1.0,    # mV → mV
     "VOLTS": 1000.0       #  V → mV
 }
 
+# Patterns of the fixed MUSE layout used by the fast extractor. An element
+# is either a leaf with its text or a bare opening/closing tag.
+ELEMENT_PATTERN = re.compile(rb"<(/?)(\w+)>(?:([^<]*)</\2>)?")
+WAVEFORM_TYPE_PATTERN = re.compile(rb"<WaveformType>\s*([^<]*?)\s*</WaveformType>")
+
+LEAD_DATA_FIELDS = {"LeadID", "WaveFormData", "LeadAmplitudeUnits", "LeadAmplitudeUnitsPerBit"}
+QRS_FIELDS = {"Type", "Time"}
+
 @contextmanager
 def change_dir(destination):
     """
@@ -60,6 +104,20 @@ def change_dir(destination):
         os.chdir(cwd)
 
 
+@contextmanager
+def map_file(path: Path):
+    """
+    Memory-map a file read-only, so parsers read it straight from the OS
+    page cache instead of a private copy of its contents.
+
+    Args:
+        path: Path to the file to map.
+    """
+    with open(path, "rb") as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
 def read_muse_file(path: str) -> Dict[str, Any]:
     """
     Read and parse a GE MUSE XML file into a Python dictionary.
@@ -75,73 +133,437 @@ def read_muse_file(path: str) -> Dict[str, Any]:
         raise FileNotFoundError(f"MUSE file not found: {path}")
 
     logger.info("Reading MUSE file: %s", path)
-    with open(path, "rb") as muse_file:
-        return xmltodict.parse(muse_file.read().decode("utf-8"))
+    with map_file(path) as muse_file:
+        # Let expat read the mapped file itself, so the document is never held
+        # in memory as a whole (xmltodict enables expat text buffering).
+        return xmltodict.parse(muse_file, process_namespaces=False)
 
 
-def select_waveform(ecg: Dict[str, Any]) -> Dict[str, Any]:
+def select_waveform(resting: Dict[str, Any]) -> Dict[str, Any]:
     """
     Select the 'Rhythm' waveform section from the MUSE ECG XML structure.
 
     Args:
-        ecg: Parsed MUSE ECG dictionary.
+        resting: The 'RestingECG' section of the parsed MUSE ECG dictionary.
 
     Returns:
         The waveform dictionary that corresponds to the 'Rhythm' ECG signal.
     """
-    for waveform in ecg["RestingECG"]["Waveform"]:
-        if waveform["WaveformType"] == "Rhythm":
-            return waveform
-    raise ValueError("No 'Rhythm' waveform found in MUSE ECG file.")
+    waveforms = resting["Waveform"]
+    if isinstance(waveforms, dict):
+        waveforms = [waveforms]
+
+    waveform = next((wf for wf in waveforms if wf["WaveformType"] == "Rhythm"), None)
+    if waveform is None:
+        raise ValueError("No 'Rhythm' waveform found in MUSE ECG file.")
+    return waveform
 
 
-def process_waveforms(waveform: Dict[str, Any]) -> Dict[str, np.ndarray]:
+def extract_entries(muse_data: bytes, entry_tag: bytes, start: int, end: int
+                    ) -> Optional[Tuple[List[Dict[str, str]], Dict[str, str]]]:
     """
-    Decode base64 ECG waveforms for each lead and compute derived leads.
+    Collect the leaf fields of each `entry_tag` element within a byte range.
+
+    Args:
+        muse_data: The raw (or memory-mapped) MUSE XML content.
+        entry_tag: The tag of the entries to collect, e.g. b"LeadData".
+        start: Start offset of the range.
+        end: End offset of the range.
+
+    Returns:
+        The fields of each entry and the leaf fields outside the entries, or
+        None if a field repeats within an entry (unexpected layout).
+    """
+    entries: List[Dict[str, str]] = []
+    outer: Dict[str, str] = {}
+    entry: Optional[Dict[str, str]] = None
+
+    for match in ELEMENT_PATTERN.finditer(muse_data, start, end):
+        closing, tag, text = match.groups()
+        if text is None:
+            if tag == entry_tag:
+                entry = None if closing else {}
+                if entry is not None:
+                    entries.append(entry)
+            continue
+
+        fields = outer if entry is None else entry
+        name = tag.decode("latin-1")
+        if name in fields:
+            return None
+        fields[name] = text.decode("latin-1")
+
+    return entries, outer
+
+
+def fast_parse_muse(muse_data: bytes) -> Optional[Tuple[List[Dict[str, str]],
+                                                        List[Dict[str, str]], Optional[str]]]:
+    """
+    Extract the 'Rhythm' leads, QRS entries and sampling base with regular
+    expressions tailored to the fixed MUSE layout, without a generic XML parser.
 
     Args:
-        waveform: The selected waveform dictionary from the MUSE file.
+        muse_data: The raw (or memory-mapped) MUSE XML content.
+
+    Returns:
+        The 'Rhythm' LeadData entries, the QRS entries and the SampleBase, or
+        None if the content does not match the expected layout.
+    """
+    # Locate the 'Rhythm' waveform with plain substring searches
+    start = muse_data.find(b"<WaveformType>")
+    while start != -1:
+        waveform_type = WAVEFORM_TYPE_PATTERN.match(muse_data, start)
+        if waveform_type is not None and waveform_type.group(1) == b"Rhythm":
+            break
+        start = muse_data.find(b"<WaveformType>", start + 1)
+    else:
+        return None
+    end = muse_data.find(b"</Waveform>", start)
+    waveform = extract_entries(muse_data, b"LeadData", start, end) if end != -1 else None
+    if waveform is None:
+        return None
+    lead_entries, waveform_fields = waveform
+
+    # Only read QRS entries from RestingECG/QRSTimesTypes
+    qrs_entries: List[Dict[str, str]] = []
+    qrs_start = muse_data.find(b"<QRSTimesTypes>")
+    if qrs_start != -1:
+        qrs_end = muse_data.find(b"</QRSTimesTypes>", qrs_start)
+        qrs_times = extract_entries(muse_data, b"QRS", qrs_start, qrs_end) \
+            if qrs_end != -1 else None
+        if qrs_times is None:
+            return None
+        qrs_entries = qrs_times[0]
+
+    if not lead_entries or any(not LEAD_DATA_FIELDS <= lead.keys() for lead in lead_entries) \
+            or any(not QRS_FIELDS <= qrs.keys() for qrs in qrs_entries):
+        return None
+    return lead_entries, qrs_entries, waveform_fields.get("SampleBase")
+
+
+def stream_muse(path: str) -> Tuple[List[Dict[str, str]], List[Dict[str, str]], Optional[str]]:
     """
-    lead_waveforms: Dict[str, np.ndarray] = {lead_name: [] for lead_name in LEAD_NAMES}
+    Stream a GE MUSE XML file and extract only the data needed for conversion.
 
+    Unlike `read_muse_file`, the full document tree is never built: elements
+    are released as soon as they have been processed, which keeps memory use
+    flat even for large exports.
+
+    Args:
+        path: Path to the XML file exported from MUSE.
+
+    Returns:
+        The 'Rhythm' LeadData entries, the QRS entries and the 'Rhythm'
+        SampleBase (None if absent).
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"MUSE file not found: {path}")
+
+    logger.info("Streaming MUSE file: %s", path)
+    lead_entries: List[Dict[str, str]] = []
+    qrs_entries: List[Dict[str, str]] = []
+    sample_base: Optional[str] = None
+    current_waveform_type: Optional[str] = None
+
+    with map_file(path) as muse_file:
+        context = etree.iterparse(
+            muse_file, events=("end",), huge_tree=True,
+            resolve_entities=False, no_network=True,
+            tag=("Waveform", "WaveformType", "SampleBase", "LeadData", "QRS")
+        )
+        for _, elem in context:
+            if elem.tag == "WaveformType":
+                current_waveform_type = (elem.text or "").strip()
+            elif elem.tag == "Waveform":
+                current_waveform_type = None
+            elif current_waveform_type == "Rhythm" and elem.tag == "SampleBase":
+                sample_base = elem.text
+            elif current_waveform_type == "Rhythm" and elem.tag == "LeadData":
+                lead_entries.append({child.tag: child.text for child in elem})
+            elif elem.tag == "QRS" and elem.getparent().tag == "QRSTimesTypes":
+                qrs_entries.append({child.tag: child.text for child in elem})
+
+            # Release the processed element and its already visited siblings
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        del context
+
+    if not lead_entries:
+        raise ValueError("No 'Rhythm' waveform found in MUSE ECG file.")
+    return lead_entries, qrs_entries, sample_base
+
+
+def parse_muse(path: str, fast_parse: bool = False
+               ) -> Tuple[List[Dict[str, str]], Any, Optional[str]]:
+    """
+    Extract the 'Rhythm' leads, QRS entries and sampling base of a MUSE file.
+
+    Uses the streaming lxml parser when available and the xmltodict based
+    full-tree parser otherwise. With `fast_parse`, the regular expression
+    based `fast_parse_muse` is tried first and the XML parsers are only used
+    if the file does not match its expected layout.
+
+    Args:
+        path: Path to the XML file exported from MUSE.
+        fast_parse: Whether to try `fast_parse_muse` first.
+
+    Returns:
+        The 'Rhythm' LeadData entries, the QRS entries and the SampleBase.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"MUSE file not found: {path}")
+
+    if fast_parse:
+        logger.info("Extracting MUSE file: %s", path)
+        with map_file(path) as muse_file:
+            extracted = fast_parse_muse(muse_file)
+        if extracted is not None:
+            return extracted
+        logger.debug("Unexpected MUSE layout, falling back to the XML parser.")
+
+    if etree is not None:
+        return stream_muse(path)
+
+    resting = read_muse_file(path)["RestingECG"]
+    waveform = select_waveform(resting)
+    qrs_info = resting.get("QRSTimesTypes", {}).get("QRS")
+
+    # xmltodict returns a single LeadData entry as a dict
     lead_list = waveform["LeadData"]
     if isinstance(lead_list, dict):
         lead_list = [lead_list]
+    return lead_list, qrs_info, waveform.get("SampleBase")
+
+
+def store_int16(values: np.ndarray, gain: float, out: np.ndarray) -> float:
+    """
+    Store int32 samples in an int16 column, right-shifting them if needed.
+
+    WFDB format 16 reserves -32768 for missing samples, so values are shifted
+    (rounding to nearest) until they fit into [-32767, 32767] and the gain is
+    reduced accordingly.
+
+    Args:
+        values: The int32 samples, shifted in place if they do not fit.
+        gain: The ADC gain (counts per mV) of `values`.
+        out: The int16 destination.
+
+    Returns:
+        The ADC gain of the stored samples.
+    """
+    def shifted(value: int, shift: int) -> int:
+        return (value + (1 << shift >> 1)) >> shift
+
+    high, low = int(values.max(initial=0)), int(values.min(initial=0))
+    shift = 0
+    while shifted(high, shift) > 32767 or shifted(low, shift) < -32767:
+        shift += 1
+    if shift:
+        np.add(values, 1 << (shift - 1), out=values)
+        np.right_shift(values, shift, out=values)
+    out[:] = values
+    return gain / (1 << shift)
+
+
+def int16_from_bytes(buffer: bytes) -> np.ndarray:
+    """
+    View little-endian int16 samples in native byte order.
+
+    This is a zero-copy view on little-endian hosts. On big-endian hosts the
+    bytes are swapped once here, so later arithmetic runs on native data.
+
+    Args:
+        buffer: The decoded little-endian sample bytes.
+
+    Returns:
+        The samples as a native int16 array.
+    """
+    samples = np.frombuffer(buffer, dtype=np.int16)
+    if not NATIVE_LITTLE_ENDIAN:
+        samples = samples.byteswap()
+    return samples
+
+
+def decode_lead(lead_data: str) -> np.ndarray:
+    """
+    Decode the base64 WaveFormData of a single lead into int16 samples.
+
+    Args:
+        lead_data: The base64 encoded samples of the lead.
+
+    Returns:
+        The int16 samples of the lead.
+    """
+    return int16_from_bytes(b64decode(lead_data, validate=False))
+
+
+def decode_waveform_data(waveform_data: List[str]) -> List[np.ndarray]:
+    """
+    Decode the base64 WaveFormData of several leads into int16 samples.
+
+    Large exports are decoded on one thread per lead when pybase64 is
+    available, as it releases the GIL.
+
+    Args:
+        waveform_data: The base64 encoded samples of each lead.
+
+    Returns:
+        The int16 samples of each lead.
+    """
+    workers = min(len(waveform_data), os.cpu_count() or 1)
+    if PARALLEL_DECODE and workers > 1 \
+            and sum(map(len, waveform_data)) >= PARALLEL_DECODE_MIN_SIZE:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(decode_lead, waveform_data))
+
+    return [decode_lead(data) for data in waveform_data]
+
+
+def decode_leads(lead_list: List[Dict[str, str]]) -> Tuple[Dict[str, np.ndarray],
+                                                             Dict[str, float]]:
+    """
+    Decode the base64 samples and the mV per bit factor of each lead.
+
+    Args:
+        lead_list: The LeadData entries of the selected waveform.
+
+    Returns:
+        The raw int16 samples and the mV per bit factors keyed by lead name.
+    """
+    # A repeated lead overwrites the earlier one, keeping names and data paired
+    lead_entries: Dict[str, Tuple[float, str]] = {}
 
     for lead in lead_list:
-        lead_id = lead["LeadID"].strip().upper()
-        lead_data = lead["WaveFormData"]
-        decoded = base64.b64decode(lead_data)
-        samples = np.frombuffer(decoded, dtype="<i2")
+        lead_id, lead_data, units, units_per_bit = (
+            lead["LeadID"], lead["WaveFormData"],
+            lead["LeadAmplitudeUnits"], lead["LeadAmplitudeUnitsPerBit"]
+        )
+        column = UPPER_LEAD_INDEX.get(lead_id.strip().upper())
+        if column is None:
+            logger.warning("Skipping unknown lead: %s", lead_id)
+            continue
 
-        scale = UNIT_SCALE_MAP.get(lead["LeadAmplitudeUnits"].strip().upper())
+        scale = UNIT_SCALE_MAP.get(units.strip().upper())
         if scale is None:
-            raise ValueError(f"Unknown amplitude unit: {lead['LeadAmplitudeUnits']}")
-
-        # Convert to mV
-        lead_waveforms[lead_id] = samples * float(lead["LeadAmplitudeUnitsPerBit"]) * scale
-        logger.debug("Processed lead %s: %s samples.", lead_id, len(samples))
-
-    # Compute derived leads
-    if "I" in lead_waveforms and "II" in lead_waveforms:
-        lead_waveforms["III"] = lead_waveforms["II"] - lead_waveforms["I"]
-        lead_waveforms["aVR"] = -(lead_waveforms["I"] + lead_waveforms["II"]) / 2
-        lead_waveforms["aVL"] = lead_waveforms["I"] - 0.5 * lead_waveforms["II"]
-        lead_waveforms["aVF"] = lead_waveforms["II"] - 0.5 * lead_waveforms["I"]
-        logger.debug("Derived leads (III, aVR, aVL, aVF) computed.")
+            raise ValueError(f"Unknown amplitude unit: {units}")
+
+        lead_entries[LEAD_NAMES[column]] = (float(units_per_bit) * scale, lead_data)
+
+    lead_factors = {name: factor for name, (factor, _) in lead_entries.items()}
+    lead_samples = dict(zip(lead_entries, decode_waveform_data(
+        [lead_data for _, lead_data in lead_entries.values()])))
+    for lead_id, samples in lead_samples.items():
+        logger.debug("Decoded lead %s: %s samples.", lead_id, len(samples))
+
+    return lead_samples, lead_factors
+
+
+def derive_leads_exact(lead_i: np.ndarray, lead_ii: np.ndarray,
+                       d_signal: np.ndarray, adc_gain: List[float]) -> None:
+    """
+    Compute the derived leads exactly in counts, for leads I and II sharing
+    a resolution. The halves of aVR, aVL and aVF go into a doubled gain
+    instead of rounding.
+
+    Args:
+        lead_i: The int16 samples of lead I.
+        lead_ii: The int16 samples of lead II.
+        d_signal: The (N, 12) int16 signal matrix, derived columns are filled.
+        adc_gain: The ADC gain of each column, lead I's must be set already.
+    """
+    lead_i = lead_i.astype(np.int32)
+    lead_ii = lead_ii.astype(np.int32)
+    gain = adc_gain[LEAD_INDEX["I"]]
+    iii, avr, avl, avf = (LEAD_INDEX[name] for name in ("III", "aVR", "aVL", "aVF"))
+    derived = np.empty(lead_i.size, dtype=np.int32)
+
+    np.subtract(lead_ii, lead_i, out=derived)
+    adc_gain[iii] = store_int16(derived, gain, d_signal[:, iii])
+    np.add(lead_i, lead_ii, out=derived)
+    np.negative(derived, out=derived)
+    adc_gain[avr] = store_int16(derived, 2 * gain, d_signal[:, avr])
+    np.subtract(lead_i, lead_ii, out=derived)
+    np.add(derived, lead_i, out=derived)
+    adc_gain[avl] = store_int16(derived, 2 * gain, d_signal[:, avl])
+    np.subtract(lead_ii, lead_i, out=derived)
+    np.add(derived, lead_ii, out=derived)
+    adc_gain[avf] = store_int16(derived, 2 * gain, d_signal[:, avf])
+
+
+def derive_leads_quantized(lead_i: np.ndarray, lead_ii: np.ndarray,
+                           d_signal: np.ndarray, adc_gain: List[float]) -> None:
+    """
+    Compute the derived leads in mV and quantize each one to the full int16
+    range, for leads I and II without a common resolution.
+
+    Args:
+        lead_i: The samples of lead I in mV.
+        lead_ii: The samples of lead II in mV.
+        d_signal: The (N, 12) int16 signal matrix, derived columns are filled.
+        adc_gain: The ADC gain of each column, derived ones are filled.
+    """
+    derived = {
+        "III": lead_ii - lead_i,
+        "aVR": -0.5 * (lead_i + lead_ii),
+        "aVL": lead_i - 0.5 * lead_ii,
+        "aVF": lead_ii - 0.5 * lead_i
+    }
+    for lead_name, values in derived.items():
+        column = LEAD_INDEX[lead_name]
+        peak = float(np.abs(values).max(initial=0.0))
+        adc_gain[column] = 32767 / peak if peak else 1.0
+        np.multiply(values, adc_gain[column], out=values)
+        d_signal[:, column] = np.rint(values, out=values)
+
+
+def process_waveforms(lead_list: List[Dict[str, str]]) -> Tuple[np.ndarray, List[float]]:
+    """
+    Decode base64 ECG waveforms for each lead and compute derived leads.
+
+    The samples are kept as digital values, no conversion to mV is done.
+
+    Args:
+        lead_list: The LeadData entries of the selected waveform.
+
+    Returns:
+        The (N, 12) int16 signal matrix, columns ordered as `LEAD_NAMES`,
+        and the ADC gain (counts per mV) of each column.
+    """
+    lead_samples, lead_factors = decode_leads(lead_list)
+    for lead_name in MEASURED_LEAD_NAMES:
+        if lead_name not in lead_samples:
+            raise ValueError(f"Missing waveform data for lead: {lead_name}")
+
+    # Every lead is written straight into its column of the final matrix
+    d_signal = np.empty((lead_samples["I"].size, len(LEAD_NAMES)), dtype=np.int16, order="C")
+    adc_gain = [0.0] * len(LEAD_NAMES)
+    for lead_name in MEASURED_LEAD_NAMES:
+        column = LEAD_INDEX[lead_name]
+        d_signal[:, column] = lead_samples[lead_name]
+        adc_gain[column] = 1.0 / lead_factors[lead_name]
+
+    # Compute derived leads (III, aVR, aVL, aVF)
+    if lead_factors["I"] == lead_factors["II"]:
+        derive_leads_exact(lead_samples["I"], lead_samples["II"], d_signal, adc_gain)
     else:
-        logger.warning("Cannot compute derived leads: leads I or II missing.")
+        derive_leads_quantized(lead_samples["I"] * lead_factors["I"],
+                               lead_samples["II"] * lead_factors["II"], d_signal, adc_gain)
+    logger.debug("Derived leads (III, aVR, aVL, aVF) computed.")
 
-    return lead_waveforms
+    return d_signal, adc_gain
 
 
-def save_wfdb(lead_waveforms: Dict[str, np.ndarray], output_name: str = "wfdb_record",
+def save_wfdb(d_signal: np.ndarray, adc_gain: List[float], output_name: str = "wfdb_record",
               comments: Optional[List[str]] = None, fs: int = 500) -> None:
     """
     Save the processed ECG signals into WFDB format (.hea and .dat files).
 
     Args:
-        lead_waveforms: The processed waveforms of the MUSE export.
+        d_signal: The (N, 12) int16 signal matrix, columns ordered as `LEAD_NAMES`.
+        adc_gain: The ADC gain (counts per mV) of each column.
         output_name: The base name for the output WFDB files.
         fs: Sampling frequency in Hz (default: 500).
     """
@@ -151,55 +573,84 @@ def save_wfdb(lead_waveforms: Dict[str, np.ndarray], output_name: str = "wfdb_re
     # Convert record_name string to a Path object for robust handling
     output_path = Path(output_name)
 
-    signals = []
-    for lead in LEAD_NAMES:
-        if lead_waveforms[lead].size == 0:
-            raise ValueError(f"Missing waveform data for lead: {lead}")
-        signals.append(lead_waveforms[lead])
-
-    # Stack all leads into (N, 12) matrix
-    signals = np.column_stack(signals)
-
     with change_dir(output_path.parent):
         wfdb.wrsamp(
             record_name=str(output_path.name),
             fs=fs,
             units=["mV"] * len(LEAD_NAMES),
             sig_name=LEAD_NAMES,
-            p_signal=signals,
-            fmt=['16'] * signals.shape[1],
+            d_signal=d_signal,
+            adc_gain=adc_gain,
+            baseline=[0] * len(LEAD_NAMES),
+            fmt=['16'] * len(LEAD_NAMES),
             comments=comments
         )
 
     logger.info("WFDB files saved: %s.hea / %s.dat", output_name, output_name)
 
 
-def save_qrs_annotations(record_name: str, qrs_data: list):
+def build_qrs_annotations(qrs_data: list, fs: int = 500, include_aux: bool = False
+                          ) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
     """
-    Save QRS annotations from parsed MUSE XML data to a WFDB .atr file.
+    Build the WFDB annotation fields from parsed MUSE QRS entries.
 
     Parameters
     ----------
-    record_name : str
-        Name of the WFDB record (without extension)
     qrs_data : list[dict]
         List of QRS entries, each with keys ['Number', 'Type', 'Time']
     fs : int
         Sampling frequency (Hz)
+    include_aux : bool
+        Whether to build 'QRS_<Number>' aux notes
+
+    Returns
+    -------
+    tuple
+        The annotation sample indices, symbols and aux notes (or None)
     """
-    logger.info("Saving QRS annotations for record '%s'", record_name)
+    if isinstance(qrs_data, dict):
+        qrs_data = [qrs_data]
 
-    # Convert record_name string to a Path object for robust handling
-    output_path = Path(record_name)
+    # Fill right-sized arrays directly, without intermediate lists
+    count = len(qrs_data)
 
     # Convert <Time> (ms) to sample index
-    samples = np.array([int(qrs['Time']) for qrs in qrs_data])
+    samples = np.fromiter((int(qrs['Time']) * fs // 1000 for qrs in qrs_data),
+                          dtype=np.int32, count=count)
 
-    # Symbol: all '?' by default; can map from 'Type'
-    symbols = np.array([QRS_TYPE_MAP.get(qrs['Type'], '?') for qrs in qrs_data])
+    # Symbol: '?' by default; mapped from 'Type'
+    symbols = np.fromiter((QRS_TYPE_MAP.get(qrs['Type'], '?') for qrs in qrs_data),
+                          dtype="U1", count=count)
 
-    # Optional aux notes
-    aux_notes = np.array([f"QRS_{qrs['Number']}" for qrs in qrs_data])
+    # Optional aux notes, off by default as the number matches the annotation index
+    aux_notes = None
+    if include_aux:
+        numbers = np.array([qrs['Number'] for qrs in qrs_data], dtype="U")
+        aux_notes = np.char.add("QRS_", numbers)
+
+    return samples, symbols, aux_notes
+
+
+def write_qrs_annotations(record_name: str, samples: np.ndarray, symbols: np.ndarray,
+                          aux_notes: Optional[np.ndarray] = None):
+    """
+    Write prepared QRS annotation fields to a WFDB .atr file.
+
+    Parameters
+    ----------
+    record_name : str
+        Name of the WFDB record (without extension)
+    samples : np.ndarray
+        Annotation sample indices
+    symbols : np.ndarray
+        Annotation symbols
+    aux_notes : np.ndarray, optional
+        Annotation aux notes
+    """
+    logger.info("Saving QRS annotations for record '%s'", record_name)
+
+    # Convert record_name string to a Path object for robust handling
+    output_path = Path(record_name)
 
     with change_dir(output_path.parent):
         wfdb.wrann(
@@ -213,14 +664,141 @@ def save_qrs_annotations(record_name: str, qrs_data: list):
     logger.debug("Saved %s QRS annotations.", len(samples))
 
 
-def muse_to_wfdb(path: str, output_name: str = "wfdb_record",
-                 comments: Optional[List[str]] = None) -> bool:
+def save_qrs_annotations(record_name: str, qrs_data: list, fs: int = 500,
+                         include_aux: bool = False):
+    """
+    Save QRS annotations from parsed MUSE XML data to a WFDB .atr file.
+
+    Parameters
+    ----------
+    record_name : str
+        Name of the WFDB record (without extension)
+    qrs_data : list[dict]
+        List of QRS entries, each with keys ['Number', 'Type', 'Time']
+    fs : int
+        Sampling frequency (Hz)
+    include_aux : bool
+        Whether to store the QRS numbers as 'QRS_<Number>' aux notes
+    """
+    write_qrs_annotations(record_name, *build_qrs_annotations(qrs_data, fs, include_aux))
+
+
+def convert_muse(path: str, include_aux: bool = False,
+                 fast_parse: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Run the parsing and decoding steps of the conversion.
+
+    Args:
+        path: Path to the input MUSE XML file.
+        include_aux: Whether to build 'QRS_<Number>' aux notes.
+        fast_parse: Whether to try the regular expression based extractor first.
+
+    Returns:
+        The converted arrays: 'd_signal', 'adc_gain' and 'fs', plus
+        'qrs_sample', 'qrs_symbol' and optionally 'qrs_aux_note' if the
+        file has QRS entries.
+    """
+    lead_list, qrs_info, sample_base = parse_muse(path, fast_parse)
+
+    # Process leads
+    frequency = int(sample_base or 500)
+    d_signal, adc_gain = process_waveforms(lead_list)
+    converted = {
+        "d_signal": d_signal,
+        "adc_gain": np.array(adc_gain),
+        "fs": np.array(frequency)
+    }
+
+    # Process complexes
+    if qrs_info:
+        samples, symbols, aux_notes = build_qrs_annotations(qrs_info, frequency, include_aux)
+        converted["qrs_sample"] = samples
+        converted["qrs_symbol"] = symbols
+        if aux_notes is not None:
+            converted["qrs_aux_note"] = aux_notes
+
+    return converted
+
+
+def conversion_cache_key(path: str, include_aux: bool = False) -> str:
+    """
+    Identify a conversion by the input file's path, modification time and size,
+    and by `CACHE_FORMAT_VERSION`.
+
+    Args:
+        path: Path to the input MUSE XML file.
+        include_aux: Whether the conversion builds aux notes.
+
+    Returns:
+        The hex digest identifying the conversion.
+    """
+    stat = os.stat(path)
+    key = (f"{CACHE_FORMAT_VERSION}:{Path(path).resolve()}:"
+           f"{stat.st_mtime_ns}:{stat.st_size}:{include_aux}")
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def load_cached_conversion(cache_path: Path, key: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Load the arrays of a previous conversion if the cache matches the key.
+
+    Args:
+        cache_path: Path to the .npz cache file.
+        key: The expected key from `conversion_cache_key`.
+
+    Returns:
+        The converted arrays, or None if there is no valid cache.
+    """
+    if not cache_path.exists():
+        return None
+
+    try:
+        with np.load(cache_path) as cached:
+            if str(cached["key"]) != key:
+                logger.debug("Stale conversion cache: %s", cache_path)
+                return None
+            return {name: cached[name] for name in cached.files if name != "key"}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+        logger.warning("Ignoring unreadable conversion cache %s: %s", cache_path, error)
+        return None
+
+
+def save_cached_conversion(cache_path: Path, key: str, converted: Dict[str, np.ndarray]) -> None:
+    """
+    Store the arrays of a conversion, replacing the cache file atomically so
+    an interrupted write never leaves a truncated cache behind.
+
+    Args:
+        cache_path: Path to the .npz cache file.
+        key: The key from `conversion_cache_key`.
+        converted: The converted arrays from `convert_muse`.
+    """
+    with tempfile.NamedTemporaryFile(dir=cache_path.parent, prefix=cache_path.name,
+                                     suffix=".tmp", delete=False) as cache_file:
+        temp_path = Path(cache_file.name)
+        try:
+            np.savez(cache_file, key=np.array(key), **converted)
+        except BaseException:
+            cache_file.close()
+            temp_path.unlink()
+            raise
+    os.replace(temp_path, cache_path)
+
+
+def muse_to_wfdb(path: str, output_name: str = "wfdb_record",  # pylint: disable=too-many-arguments
+                 comments: Optional[List[str]] = None, *, include_aux: bool = False,
+                 cache: bool = False, fast_parse: bool = False) -> bool:
     """
     Main function to convert a MUSE XML ECG file into WFDB format.
 
     Args:
         path: Path to the input MUSE XML file.
         output_name: Output WFDB record name (without extension).
+        include_aux: Whether to store 'QRS_<Number>' aux notes with the annotations.
+        cache: Whether to reuse (and store) the decoded data in an
+            '<output_name>.cache.npz' file while the input file is unchanged.
+        fast_parse: Whether to try the regular expression based extractor
+            before the XML parsers (faster than xmltodict, not than lxml).
 
     Returns:
         Wether annotations were saved.
@@ -228,20 +806,27 @@ def muse_to_wfdb(path: str, output_name: str = "wfdb_record",
     comments = comments or []
     logger.info("Converting MUSE XML to WFDB: %s", path)
 
-    ecg_data = read_muse_file(path)
-    waveform = select_waveform(ecg_data)
+    converted = None
+    if cache:
+        cache_path = Path(f"{output_name}.cache.npz")
+        key = conversion_cache_key(path, include_aux)
+        converted = load_cached_conversion(cache_path, key)
 
-    # Process leads
-    frequency = int(waveform.get("SampleBase", 500))
-    lead_waveforms = process_waveforms(waveform)
+    if converted is None:
+        converted = convert_muse(path, include_aux, fast_parse)
+        if cache:
+            save_cached_conversion(cache_path, key, converted)
+    else:
+        logger.info("Using cached conversion: %s", cache_path)
 
     # Save processed data in WFDB format
-    save_wfdb(lead_waveforms, output_name, comments, frequency)
+    save_wfdb(converted["d_signal"], converted["adc_gain"].tolist(), output_name,
+              comments, int(converted["fs"]))
 
     # Save complexes in WFDB format
-    qrs_info = ecg_data["RestingECG"].get("QRSTimesTypes", {}).get("QRS")
-    if qrs_info:
-        save_qrs_annotations(output_name, qrs_info)
+    if "qrs_sample" in converted:
+        write_qrs_annotations(output_name, converted["qrs_sample"], converted["qrs_symbol"],
+                              converted.get("qrs_aux_note"))
         return True
 
     logger.info("MUSE XML to WFDB conversion completed successfully.")